@@ -10,7 +10,9 @@ import logging
 import re
 import signal
 import sys
+import threading
 import uuid
+from collections import OrderedDict
 from pathlib import Path
 from typing import Callable, Dict, List, Optional
 
@@ -31,6 +33,7 @@ from renogybt import (
     RoverHistoryClient,
     Utils,
     create_sensor_entities_from_data,
+    run_event_loop,
     update_sensor_entities,
 )
 
@@ -41,6 +44,15 @@ logger.setLevel(logging.DEBUG)
 # Skip forwarding advertisements that originate from the local adapter
 ADAPTER_NAME_PATTERN = re.compile(r"^hci\d+\s+\([0-9A-Fa-f:]+\)$")
 
+# Advertisements whose payload is unchanged from the last one forwarded for
+# the same address within this many seconds are not forwarded again (BlueZ
+# repeats unchanged reports frequently)
+ADVERTISEMENT_DEDUP_WINDOW = 1.0
+# ...unless the RSSI moved by at least this many dB since then
+ADVERTISEMENT_DEDUP_RSSI_DELTA = 5
+# Addresses remembered for suppression; the least recently forwarded is evicted
+ADVERTISEMENT_DEDUP_MAX_ENTRIES = 1024
+
 
 def _is_in_progress_error(exc: Exception) -> bool:
     """Return True if the exception indicates an in-progress BlueZ operation."""
@@ -573,26 +585,56 @@ def _extract_adv_flags(advertisement: AdvertisementData) -> Optional[int]:
 
 
 def _ble_packet_to_dict(device: BLEDevice, advertisement: AdvertisementData) -> Dict[str, object]:
-    """Translate bleak advertisement structures to ESPHome payload format."""
-    manufacturer_data = {
-        str(k): bytes(v) for k, v in (advertisement.manufacturer_data or {}).items()
-    }
-    service_data = {
-        k: bytes(v) for k, v in (advertisement.service_data or {}).items()
-    }
+    """Translate bleak advertisement structures to ESPHome payload format.
+
+    Bleak builds fresh dicts/lists for every advertisement and the API server
+    accepts int company ids and bytes values, so they are passed through
+    without copying.
+    """
     return {
         "address": device.address,
         "rssi": advertisement.rssi,
         "address_type": "random" if getattr(device, "address_type", "public") == "random" else "public",
         "name": advertisement.local_name or "",
-        "manufacturer_data": manufacturer_data,
-        "service_data": service_data,
-        "service_uuids": list(advertisement.service_uuids or []),
+        "manufacturer_data": advertisement.manufacturer_data or {},
+        "service_data": advertisement.service_data or {},
+        "service_uuids": advertisement.service_uuids or [],
         "tx_power": advertisement.tx_power,
         "flags": _extract_adv_flags(advertisement),
     }
 
 
+def _run_in_thread(
+    loop: asyncio.AbstractEventLoop, func: Callable[[], None], name: str
+) -> asyncio.Future:
+    """Run a long-lived blocking call on its own daemon thread.
+
+    The default executor is kept free for short blocking calls; the returned
+    future resolves on the loop once ``func`` returns.
+    """
+    future = loop.create_future()
+
+    def _finish(exc: Optional[BaseException]) -> None:
+        if future.done():
+            return
+        if exc is None:
+            future.set_result(None)
+        else:
+            future.set_exception(exc)
+
+    def _target() -> None:
+        error: Optional[BaseException] = None
+        try:
+            func()
+        except BaseException as exc:  # pragma: no cover - propagated to the future
+            error = exc
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(_finish, error)
+
+    threading.Thread(target=_target, name=name, daemon=True).start()
+    return future
+
+
 async def run_proxy(config_path: Path) -> None:
     """Main proxy coroutine with event loop responsiveness improvements."""
     
@@ -734,6 +776,9 @@ async def run_proxy(config_path: Path) -> None:
 
     api_server.set_advertisement_callback(register_advertisement_sender)
 
+    # address -> (forwarded at, rssi, payload content), oldest first
+    last_forwarded: "OrderedDict[str, tuple]" = OrderedDict()
+
     def on_ble_advertisement(device: BLEDevice, advertisement: AdvertisementData) -> None:
         nonlocal total_advertisements, last_adv_timestamp
         logger.debug(f"on_ble_advertisement called: device={device.address}, callback={'SET' if send_advertisement_callback else 'None'}")
@@ -752,6 +797,32 @@ async def run_proxy(config_path: Path) -> None:
             device.name or "",
             advertisement.rssi,
         )
+        # The sender stays registered after its client disconnects; skip the
+        # conversion until someone subscribes again (counters above still
+        # feed the scanner health monitor)
+        if not api_server.has_advertisement_subscribers():
+            return
+        address = device.address
+        rssi = advertisement.rssi
+        content = (
+            advertisement.local_name,
+            advertisement.tx_power,
+            advertisement.manufacturer_data,
+            advertisement.service_data,
+            advertisement.service_uuids,
+        )
+        previous = last_forwarded.get(address)
+        if previous is not None:
+            if (
+                last_adv_timestamp - previous[0] < ADVERTISEMENT_DEDUP_WINDOW
+                and abs(rssi - previous[1]) < ADVERTISEMENT_DEDUP_RSSI_DELTA
+                and previous[2] == content
+            ):
+                return
+            last_forwarded.move_to_end(address)
+        elif len(last_forwarded) >= ADVERTISEMENT_DEDUP_MAX_ENTRIES:
+            last_forwarded.popitem(last=False)
+        last_forwarded[address] = (last_adv_timestamp, rssi, content)
         payload = _ble_packet_to_dict(device, advertisement)
         send_advertisement_callback(payload)
 
@@ -1000,7 +1071,7 @@ async def run_proxy(config_path: Path) -> None:
             battery_client.set_ble_activity_callback(handle_ble_activity_legacy)
 
         def run_client() -> None:
-            """Run the battery client in executor thread.
+            """Run the battery client on its dedicated thread.
             
             FIX: Ensure we're running in the same process and not spawning subprocesses.
             The BatteryClient.start() should run synchronously in this thread.
@@ -1020,7 +1091,7 @@ async def run_proxy(config_path: Path) -> None:
                     logger.error(f"CRITICAL: Battery client changed PID from {current_pid} to {os.getpid()}!")
                     sys.exit(1)
 
-        battery_future = loop.run_in_executor(None, run_client)
+        battery_future = _run_in_thread(loop, run_client, "renogy-battery-client")
         last_renogy_read_time = loop.time()
 
         def _battery_done_callback(
@@ -1042,7 +1113,7 @@ async def run_proxy(config_path: Path) -> None:
                 loop.call_soon_threadsafe(
                     lambda: asyncio.create_task(
                         _restart_battery_client(
-                            "executor exit",
+                            "client thread exit",
                             exc,
                             getattr(client_ref, "last_error", None),
                         )
@@ -1053,7 +1124,7 @@ async def run_proxy(config_path: Path) -> None:
                 logger.debug("Renogy scheduled read completed")
 
         battery_future.add_done_callback(_battery_done_callback)
-        logger.info("Renogy client started in background executor")
+        logger.info("Renogy client started in background thread")
         if scanner_supervisor and not pause_during_renogy:
             scanner_supervisor.kick_from_thread("renogy-start")
     
@@ -1068,7 +1139,7 @@ async def run_proxy(config_path: Path) -> None:
             logger.warning("Error stopping battery client: %s", exc)
         if battery_future:
             try:
-                await asyncio.wait_for(asyncio.wrap_future(battery_future), timeout=5.0)
+                await asyncio.wait_for(battery_future, timeout=5.0)
             except asyncio.TimeoutError:
                 logger.warning("Battery client stop timed out after 5s")
                 # FIX: Cancel the future to prevent it from running indefinitely
@@ -1234,7 +1305,7 @@ def main(argv: Optional[List[str]] = None) -> None:
         raise SystemExit(1)
 
     try:
-        asyncio.run(run_proxy(config_path))
+        run_event_loop(run_proxy(config_path))
     except KeyboardInterrupt:
         logger.info("Proxy interrupted by user")
     except RuntimeError as exc:
@@ -12,11 +12,13 @@ class DataLogger:
         self.config = config
         # keep track of which devices have had HA discovery config published
         self.ha_config_sent = set()
+        # reuse one HTTP session so repeated posts keep the connection alive
+        self.session = requests.Session()
 
     def log_remote(self, json_data):
         headers = { "Authorization" : f"Bearer {self.config['remote_logging']['auth_header']}" }
         try:
-            req = requests.post(
+            req = self.session.post(
                 self.config['remote_logging']['url'],
                 json=json_data,
                 timeout=15,
@@ -161,7 +163,7 @@ class DataLogger:
             f"&v6={json_data['battery_voltage']}"
         )
         try:
-            response = requests.post(
+            response = self.session.post(
                 PVOUTPUT_URL,
                 data=data,
                 headers={
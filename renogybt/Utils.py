@@ -1,7 +1,10 @@
 # Utility helpers for parsing data and calculating values.
 
+import asyncio
 import json
+import logging
 import os
+import sys
 import time
 
 # Reads data from a list of bytes, and converts to an int
@@ -226,3 +229,16 @@ def crc16_modbus(data: bytes):
         crc_low = CRC16_LOW_BYTES[index]
 
     return bytes([crc_high, crc_low])
+
+# Runs an entry point coroutine, on uvloop's faster event loop when the
+# optional package is installed
+def run_event_loop(main):
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(main)
+    logging.info("Using uvloop event loop")
+    if sys.version_info >= (3, 12):
+        return asyncio.run(main, loop_factory=uvloop.new_event_loop)
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return asyncio.run(main)
@@ -3,16 +3,17 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import socket
 import logging
-from typing import Callable, Dict, List, Optional, Type
+import struct
+from typing import Callable, Dict, List, Optional, Set, Tuple, Type
 
 from aioesphomeapi.api_pb2 import (  # type: ignore[attr-defined]
     AuthenticationRequest,
     AuthenticationResponse,
     BluetoothConnectionsFreeResponse,
     BluetoothLEAdvertisementResponse,
-    BluetoothLERawAdvertisement,
     BluetoothLERawAdvertisementsResponse,
     BluetoothScannerMode,
     BluetoothScannerSetModeRequest,
@@ -39,6 +40,7 @@ from aioesphomeapi.api_pb2 import (  # type: ignore[attr-defined]
     UnsubscribeBluetoothLEAdvertisementsRequest,
 )
 from aioesphomeapi.core import MESSAGE_TYPE_TO_PROTO
+from google.protobuf.internal import api_implementation
 from google.protobuf.message import Message
 
 # Bluetooth proxy feature flags (based on ESPHome bluetooth_proxy component)
@@ -60,6 +62,34 @@ BLUETOOTH_PROXY_FEATURES = (
     | BLUETOOTH_PROXY_FEATURE_STATE_AND_MODE
 )
 
+# SubscribeBluetoothLEAdvertisementsRequest.flags bit requesting raw advertisements
+BLUETOOTH_PROXY_SUBSCRIPTION_FLAG_RAW_ADVERTISEMENTS = 1 << 0
+
+# Raw advertisements are coalesced into one response of at most this many
+# entries, flushed after at most this many seconds
+BLE_ADVERTISEMENT_BATCH_SIZE = 16
+BLE_ADVERTISEMENT_BATCH_DELAY = 0.02
+
+# Advertisements waiting for the writer task; the oldest is dropped when full
+BLE_ADVERTISEMENT_QUEUE_SIZE = 256
+
+# Advertisements are dropped while more than this many bytes are waiting in
+# the transport write buffer (Home Assistant not keeping up)
+BLE_ADVERTISEMENT_WRITE_BUFFER_LIMIT = 256 * 1024
+
+# Consumed bytes are trimmed from the receive buffer once they exceed this size
+BUFFER_COMPACT_THRESHOLD = 4096
+
+# Largest payload accepted from a client; requests are tiny, so anything
+# bigger is a broken or hostile peer and the connection is closed
+MAX_MESSAGE_SIZE = 1 << 20
+
+# TCP keepalive for client sockets: probe after this many idle seconds,
+# then every interval seconds, giving up after count missed probes
+TCP_KEEPALIVE_IDLE = 30
+TCP_KEEPALIVE_INTERVAL = 10
+TCP_KEEPALIVE_COUNT = 3
+
 # Connection limits - we don't support active connections
 BLUETOOTH_PROXY_MAX_CONNECTIONS = 0
 
@@ -68,16 +98,33 @@ PROTO_TO_MESSAGE_TYPE = {v: k for k, v in MESSAGE_TYPE_TO_PROTO.items()}
 logger = logging.getLogger(__name__)
 if not logger.handlers:
     logger.addHandler(logging.NullHandler())
-logger.setLevel(logging.DEBUG)
+
+if api_implementation.Type() == "python":
+    logger.warning(
+        "Pure-Python protobuf backend in use; ESPHome API serialisation will be slow. "
+        "Install protobuf>=4.21 (upb backend) or set "
+        "PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION=upb before starting the proxy."
+    )
+
+# Single-byte values (AD flags, tx power, small varints) reuse these
+# instead of allocating
+_UINT8_TABLE = tuple(bytes((i,)) for i in range(256))
 
 def _encode_varint(value: int) -> bytes:
     """Encode an integer as a protobuf varint."""
+    if 0 <= value < 0x80:
+        # Lengths and msg_types are mostly single-byte varints
+        return _UINT8_TABLE[value]
     result = bytearray()
+    _encode_varint_into(result, value)
+    return bytes(result)
+
+def _encode_varint_into(buf: bytearray, value: int) -> None:
+    """Append ``value`` as a protobuf varint to ``buf``."""
     while value > 0x7F:
-        result.append((value & 0x7F) | 0x80)
+        buf.append((value & 0x7F) | 0x80)
         value >>= 7
-    result.append(value & 0x7F)
-    return bytes(result)
+    buf.append(value)
 
 def _make_packet(msg_type: int, payload: bytes) -> bytes:
     """Create a single ESPHome API packet.
@@ -85,13 +132,287 @@ def _make_packet(msg_type: int, payload: bytes) -> bytes:
     In the modern ESPHome protocol (aioesphomeapi 42.x+), the length field
     represents ONLY the payload size, not including the msg_type varint.
     """
-    msg_type_bytes = _encode_varint(msg_type)
-    length = len(payload)  # Only payload size, not including msg_type
-    packet = bytearray([0x00])  # preamble
-    packet.extend(_encode_varint(length))
-    packet.extend(msg_type_bytes)
-    packet.extend(payload)
-    return bytes(packet)
+    return _frame(_encode_varint(msg_type), payload)
+
+def _frame_header(msg_type_varint: bytes, length: int) -> bytes:
+    """Return the preamble, length and msg_type that precede a payload."""
+    return b"".join((b"\x00", _encode_varint(length), msg_type_varint))
+
+def _frame(msg_type_varint: bytes, payload: bytes) -> bytes:
+    """Frame ``payload`` behind the preamble, length and encoded msg_type.
+
+    Built with a single join: one allocation and one copy of the payload.
+    """
+    # Length is only the payload size, not including msg_type
+    return b"".join((b"\x00", _encode_varint(len(payload)), msg_type_varint, payload))
+
+# Encoded msg_type varint per message class, so sending a message needs a
+# single dict lookup and no varint encoding for its type
+MESSAGE_TYPE_VARINTS: Dict[Type[Message], bytes] = {
+    msg_class: _encode_varint(msg_type) for msg_class, msg_type in PROTO_TO_MESSAGE_TYPE.items()
+}
+
+def _static_packet(msg: Message) -> bytes:
+    """Serialise a response whose contents never change into a framed packet."""
+    return _make_packet(PROTO_TO_MESSAGE_TYPE[msg.__class__], msg.SerializeToString())
+
+# Field-less/constant responses, framed once at import
+PING_RESPONSE_PACKET = _static_packet(PingResponse())
+AUTHENTICATION_RESPONSE_PACKET = _static_packet(AuthenticationResponse(invalid_password=False))
+DISCONNECT_RESPONSE_PACKET = _static_packet(DisconnectResponse())
+LIST_ENTITIES_DONE_RESPONSE_PACKET = _static_packet(ListEntitiesDoneResponse())
+NOISE_ENCRYPTION_SET_KEY_REJECTED_PACKET = _static_packet(
+    NoiseEncryptionSetKeyResponse(success=False)
+)
+# We don't support active connections, so report 0 free/limit
+CONNECTIONS_FREE_RESPONSE_PACKET = _static_packet(
+    BluetoothConnectionsFreeResponse(
+        free=BLUETOOTH_PROXY_MAX_CONNECTIONS,
+        limit=BLUETOOTH_PROXY_MAX_CONNECTIONS,
+    )
+)
+
+
+@functools.lru_cache(maxsize=32)
+def _scanner_state_packet(state: int, mode: int, configured_mode: int) -> bytes:
+    """Framed BluetoothScannerStateResponse; only a handful of combinations exist."""
+    return _static_packet(
+        BluetoothScannerStateResponse(state=state, mode=mode, configured_mode=configured_mode)
+    )
+
+def _decode_varuint(buffer: bytearray, pos: int, end: int) -> Tuple[int, int]:
+    """Decode a varint at ``pos`` and return ``(value, new_pos)``.
+
+    Returns ``(-1, pos)`` if the buffer ends before the varint does.
+    """
+    result = 0
+    shift = 0
+    start = pos
+    while pos < end:
+        byte = buffer[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not (byte & 0x80):
+            return result, pos
+        shift += 7
+        if shift >= 70:
+            raise ValueError("varint longer than 10 bytes")
+    return -1, start
+
+# Strips MAC/UUID separators in one C-level pass
+_HEX_SEPARATORS = str.maketrans("", "", ":-")
+
+@functools.lru_cache(maxsize=8192)
+def _mac_str_to_int(mac: str) -> int:
+    """Convert a colon (or dash) separated MAC address string to an integer.
+
+    Raises ValueError for anything that is not a 48-bit address (e.g. a
+    CoreBluetooth UUID), which would not fit the uint64 address field.
+    """
+    raw = bytes.fromhex(mac.translate(_HEX_SEPARATORS))
+    if len(raw) != 6:
+        raise ValueError(f"not a 48-bit MAC address: {mac!r}")
+    return int.from_bytes(raw, "big")
+
+@functools.lru_cache(maxsize=4096)
+def _uuid_to_reversed_bytes(uuid_str: str) -> Tuple[int, bytes]:
+    """Return ``(bit_length, little_endian_bytes)`` for a UUID string.
+
+    ``bit_length`` is 16, 32 or 128, or 0 for unsupported formats.
+    """
+    normalized_uuid = uuid_str.translate(_HEX_SEPARATORS)
+    bit_length = len(normalized_uuid) * 4
+    if bit_length not in (16, 32, 128):
+        return 0, b""
+    return bit_length, bytes.fromhex(normalized_uuid)[::-1]
+
+@functools.lru_cache(maxsize=1024)
+def _company_id_str(company_id: int) -> str:
+    """Manufacturer data key as sent in the legacy advertisement message."""
+    return str(company_id)
+
+_FLOAT32 = struct.Struct("<f")
+_LE_U16 = struct.Struct("<H")
+
+@functools.lru_cache(maxsize=1024)
+def _sensor_state_packet_prefix(key: int) -> bytes:
+    """Return the framed SensorStateResponse bytes that precede the state value.
+
+    Only ``state`` changes between updates for an entity, so everything up to
+    its fixed32 value (field 2, wire type 5) is encoded once per key.
+    """
+    key_field = SensorStateResponse(key=key).SerializeToString()
+    length = len(key_field) + 1 + _FLOAT32.size
+    return (
+        _frame_header(MESSAGE_TYPE_VARINTS[SensorStateResponse], length)
+        + key_field
+        + b"\x15"
+    )
+
+def _sensor_state_packet(key: int, state: float) -> bytes:
+    """Create a framed SensorStateResponse packet for ``key``."""
+    try:
+        return _sensor_state_packet_prefix(key) + _FLOAT32.pack(state)
+    except OverflowError:
+        # Out of float32 range; let protobuf apply its own conversion
+        payload = SensorStateResponse(key=key, state=state, missing_state=False).SerializeToString()
+        return _frame(MESSAGE_TYPE_VARINTS[SensorStateResponse], payload)
+
+def _index_entities_by_data_key(sensor_entities: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Map each data key (e.g. 'power') to its entity info.
+
+    Entities without an explicit ``data_key`` are looked up by their entity key.
+    """
+    return {
+        entity_info.get('data_key', entity_key): entity_info
+        for entity_key, entity_info in sensor_entities.items()
+    }
+
+def _encode_raw_advertisement(address: int, rssi: int, address_type: int, data: bytes) -> bytes:
+    """Encode a BluetoothLERawAdvertisement submessage without protobuf.
+
+    Fields: address = 1 (uint64), rssi = 2 (sint32), address_type = 3 (uint32),
+    data = 4 (bytes). Like protobuf, zero/empty fields are omitted.
+    """
+    encoded = bytearray()
+    if address:
+        encoded.append(0x08)
+        _encode_varint_into(encoded, address)
+    if rssi:
+        encoded.append(0x10)
+        _encode_varint_into(encoded, ((rssi << 1) ^ (rssi >> 31)) & 0xFFFFFFFF)
+    if address_type:
+        encoded.append(0x18)
+        _encode_varint_into(encoded, address_type)
+    if data:
+        encoded.append(0x22)
+        _encode_varint_into(encoded, len(data))
+        encoded.extend(data)
+    return bytes(encoded)
+
+def _append_ad_segment(raw: bytearray, ad_type: int, payload: bytes) -> None:
+    """Append one AD structure (length, type, payload) to ``raw``.
+
+    Empty payloads and payloads too long for the one-byte length are skipped.
+    """
+    if not payload:
+        return
+    length = len(payload) + 1
+    if length > 255:
+        logger.debug("Skipping AD type %s due to payload length %s", ad_type, length)
+        return
+    raw.extend((length, ad_type))
+    raw.extend(payload)
+
+def _encode_ad_segment(ad_type: int, payload: bytes) -> bytes:
+    """Encode one AD structure; empty if it cannot be sent."""
+    raw = bytearray()
+    _append_ad_segment(raw, ad_type, payload)
+    return bytes(raw)
+
+# A device advertises the same name and service UUIDs over and over, so the
+# encoded AD structures for those fields are cached rather than rebuilt
+@functools.lru_cache(maxsize=1024)
+def _name_ad_segment(name_bytes: bytes) -> bytes:
+    return _encode_ad_segment(0x09, name_bytes)
+
+@functools.lru_cache(maxsize=1024)
+def _service_uuids_ad_segments(service_uuids: Tuple[str, ...]) -> bytes:
+    uuid_16_bytes = []
+    uuid_32_bytes = []
+    uuid_128_bytes = []
+    for uuid_str in service_uuids:
+        bit_length, uuid_bytes = _uuid_to_reversed_bytes(uuid_str)
+        if bit_length == 16:
+            uuid_16_bytes.append(uuid_bytes)
+        elif bit_length == 32:
+            uuid_32_bytes.append(uuid_bytes)
+        elif bit_length == 128:
+            uuid_128_bytes.append(uuid_bytes)
+        else:
+            logger.debug("Skipping service UUID with unsupported format: %s", uuid_str)
+    return (
+        _encode_ad_segment(0x03, b"".join(uuid_16_bytes))
+        + _encode_ad_segment(0x05, b"".join(uuid_32_bytes))
+        + _encode_ad_segment(0x07, b"".join(uuid_128_bytes))
+    )
+
+def _build_handshake_packets(name: str, mac_address: str, version: str) -> Tuple[bytes, bytes]:
+    """Serialise the (HelloResponse, DeviceInfoResponse) packets for a server."""
+    hello = HelloResponse(
+        api_version_major=1,
+        api_version_minor=12,
+        name=name,
+        server_info=f"renogybt-proxy/{version}",
+    )
+    device_info = DeviceInfoResponse(
+        uses_password=False,
+        name=name,
+        mac_address=mac_address,
+        esphome_version=version,
+        compilation_time="",
+        model="ESPHome Bluetooth Proxy",
+        manufacturer="ESPHome",
+        has_deep_sleep=False,
+        project_name=PROJECT_NAME,
+        project_version=version,
+        webserver_port=0,
+        bluetooth_proxy_feature_flags=BLUETOOTH_PROXY_FEATURES,
+        bluetooth_mac_address=mac_address,
+        api_encryption_supported=False,
+    )
+    return (
+        _make_packet(PROTO_TO_MESSAGE_TYPE[HelloResponse], hello.SerializeToString()),
+        _make_packet(PROTO_TO_MESSAGE_TYPE[DeviceInfoResponse], device_info.SerializeToString()),
+    )
+
+def _tune_client_socket(sock: Optional[socket.socket]) -> None:
+    """Disable Nagle and enable keepalive so dead clients are noticed."""
+    if sock is None:
+        return
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        for option, value in (
+            ("TCP_KEEPIDLE", TCP_KEEPALIVE_IDLE),
+            ("TCP_KEEPINTVL", TCP_KEEPALIVE_INTERVAL),
+            ("TCP_KEEPCNT", TCP_KEEPALIVE_COUNT),
+        ):
+            if hasattr(socket, option):
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+    except OSError as exc:
+        logger.debug("Unable to tune client socket: %s", exc)
+
+def _build_list_entities_packets(sensor_entities: Dict[str, Dict]) -> List[bytes]:
+    """Serialise the ListEntities reply for a set of entities.
+
+    The packets end with the ListEntitiesDoneResponse so the whole reply goes
+    out in one write.
+    """
+    msg_type = PROTO_TO_MESSAGE_TYPE[ListEntitiesSensorResponse]
+    packets: List[bytes] = []
+    for entity_key, entity_info in sensor_entities.items():
+        sensor_response = ListEntitiesSensorResponse(
+            object_id=entity_info.get('object_id', entity_key),
+            key=entity_info['key'],
+            name=entity_info.get('name', entity_key),
+            icon=entity_info.get('icon', ''),
+            unit_of_measurement=entity_info.get('unit_of_measurement', ''),
+            accuracy_decimals=entity_info.get('accuracy_decimals', 2),
+            force_update=entity_info.get('force_update', False),
+            device_class=entity_info.get('device_class', ''),
+            state_class=entity_info.get('state_class', SensorStateClass.STATE_CLASS_MEASUREMENT),
+            disabled_by_default=entity_info.get('disabled_by_default', False),
+        )
+        logger.debug(
+            "Entity: %s (key=%d, unit=%s)",
+            entity_info.get('object_id', entity_key),
+            entity_info['key'],
+            entity_info.get('unit_of_measurement', '')
+        )
+        packets.append(_make_packet(msg_type, sensor_response.SerializeToString()))
+    packets.append(LIST_ENTITIES_DONE_RESPONSE_PACKET)
+    return packets
 
 class ESPHomeAPIProtocol(asyncio.Protocol):
     """ESPHome native API protocol handler."""
@@ -104,40 +425,51 @@ class ESPHomeAPIProtocol(asyncio.Protocol):
         on_subscribe_callback: Optional[Callable[[Callable[[dict], None]], None]] = None,
         sensor_entities: Optional[Dict[str, Dict]] = None,
         on_disconnect: Optional[Callable[[], None]] = None,
+        list_entities_packets: Optional[List[bytes]] = None,
+        handshake_packets: Optional[Tuple[bytes, bytes]] = None,
     ) -> None:
         self.name = name
         self.mac_address = mac_address
         self.version = version
+        # Hello/DeviceInfo responses only depend on name, MAC and version
+        self._hello_packet, self._device_info_packet = (
+            handshake_packets or _build_handshake_packets(name, mac_address, version)
+        )
         self._on_subscribe_callback = on_subscribe_callback
         self._sensor_entities = sensor_entities or {}
         # Create reverse mapping for O(1) lookups: data_key -> entity_info
-        self._data_key_to_entity: Dict[str, Dict] = {}
-        for entity_key, entity_info in self._sensor_entities.items():
-            # Map from the actual data key (e.g., 'power') to the entity info
-            if 'data_key' in entity_info:
-                self._data_key_to_entity[entity_info['data_key']] = entity_info
+        self._data_key_to_entity = _index_entities_by_data_key(self._sensor_entities)
+        # Serialised ListEntitiesSensorResponse packets, built lazily if not shared
+        self._prebuilt_list_entities = list_entities_packets
         self._on_disconnect = on_disconnect
         self._subscribed_to_ble = False
+        self._send_raw_only = False
         self._subscribed_to_connections_free = False
         self._subscribed_to_states = False
         self._scanner_mode = BluetoothScannerMode.BLUETOOTH_SCANNER_MODE_PASSIVE
         self._scanner_state = BluetoothScannerState.BLUETOOTH_SCANNER_STATE_IDLE
-        self._buffer: Optional[bytes] = None
+        self._buffer = bytearray()
         self._last_sensor_states: Dict[str, float] = {}  # Store last sensor values
-        self._buffer_len = 0
-        self._pos = 0
+        self._start = 0  # Offset of the first unparsed frame in _buffer
         self._transport: Optional[asyncio.Transport] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Advertisements from the scanner callback, serialised and written
+        # in batches by _advertisement_writer while subscribed
+        self._adv_queue: "asyncio.Queue[dict]" = asyncio.Queue(BLE_ADVERTISEMENT_QUEUE_SIZE)
+        self._adv_writer_task: Optional[asyncio.Task] = None
+        self._legacy_adv = BluetoothLEAdvertisementResponse()
+        self._dropped_advs = 0
         self._writelines: Optional[Callable[[List[bytes]], None]] = None
         self._close_after_send = False
 
     # asyncio.Protocol API -------------------------------------------------
 
     def connection_made(self, transport: asyncio.Transport) -> None:
-        import sys
-        sys.stderr.write(f'DEBUG: connection_made called! transport={transport}\n')
-        sys.stderr.flush()
         self._transport = transport
+        self._loop = asyncio.get_running_loop()
         self._writelines = transport.writelines  # type: ignore[attr-defined]
+        transport.set_write_buffer_limits(high=BLE_ADVERTISEMENT_WRITE_BUFFER_LIMIT)
+        _tune_client_socket(transport.get_extra_info("socket"))
         peer = transport.get_extra_info("peername")
         logger.info("ESPHome API connection from %s", peer)
 
@@ -145,233 +477,319 @@ class ESPHomeAPIProtocol(asyncio.Protocol):
         logger.info("ESPHome API connection closed")
         self._transport = None
         self._writelines = None
+        self._discard_pending_advs()
         self._subscribed_to_ble = False
+        self._send_raw_only = False
         self._subscribed_to_connections_free = False
         self._subscribed_to_states = False
         if self._on_disconnect:
             self._on_disconnect()
 
-    def data_received(self, data: bytes) -> None:
-        logger.debug("ESPHome API raw bytes received len=%d: %s", len(data), data[:20].hex())
-        if self._buffer is None:
-            self._buffer = data
-            self._buffer_len = len(data)
-        else:
-            self._buffer += data
-            self._buffer_len += len(data)
-
-        while self._buffer_len >= 3:
-            self._pos = 0
-
-            preamble = self._read_varuint()
-            if preamble != 0x00:
-                logger.error("Invalid ESPHome preamble %s; closing connection", preamble)
-                self._reset_buffer()
-                self._close_transport()
-                return
-
-            length = self._read_varuint()
-            if length == -1:
-                logger.error("Failed to read length; closing connection")
-                self._reset_buffer()
-                self._close_transport()
-                return
-
-            msg_type = self._read_varuint()
-            if msg_type == -1:
-                logger.error("Failed to read message type; closing connection")
-                self._reset_buffer()
-                self._close_transport()
-                return
-
-            # In the modern ESPHome protocol (aioesphomeapi 42.x+), the length field
-            # represents ONLY the payload size, not including the msg_type varint.
-            # This is different from older versions where length = msg_type_size + payload_size.
-            if length == 0:
-                self._remove_from_buffer()
-                self._process_packet(msg_type, b"")
-                continue
-            
-            payload_len = length
-            packet = self._read(payload_len)
-            if packet is None:
-                return  # Wait for the rest of the packet
+    def pause_writing(self) -> None:
+        # The client is not draining our responses; stop reading its
+        # requests until the write buffer falls below the low-water mark
+        if self._transport:
+            self._transport.pause_reading()
 
-            self._remove_from_buffer()
-            self._process_packet(msg_type, packet)
+    def resume_writing(self) -> None:
+        if self._transport:
+            self._transport.resume_reading()
+
+    def data_received(self, data: bytes) -> None:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("ESPHome API raw bytes received len=%d: %s", len(data), data[:20].hex())
+        # bytearray.extend is amortised O(1), unlike bytes concatenation
+        buffer = self._buffer
+        buffer.extend(data)
+        buffer_len = len(buffer)
+        start = self._start
+        frames: List[Tuple[int, bytes]] = []
+        error: Optional[str] = None
+
+        # Parse every complete frame in the buffer using locals only, then
+        # dispatch them once parsing is done
+        with memoryview(buffer) as view:
+            while buffer_len - start >= 3:
+                # The preamble is always a single 0x00 byte
+                if buffer[start] != 0x00:
+                    error = f"Invalid ESPHome preamble {buffer[start]}"
+                    break
+                pos = start + 1
+                try:
+                    length = buffer[pos]
+                    if length < 0x80:
+                        pos += 1
+                    else:
+                        length, pos = _decode_varuint(buffer, pos, buffer_len)
+                        if length == -1:
+                            break  # Wait for the rest of the header
+                    if length > MAX_MESSAGE_SIZE:
+                        error = f"ESPHome message of {length} bytes exceeds {MAX_MESSAGE_SIZE}"
+                        break
+                    if pos >= buffer_len:
+                        break
+                    msg_type = buffer[pos]
+                    if msg_type < 0x80:
+                        pos += 1
+                    else:
+                        msg_type, pos = _decode_varuint(buffer, pos, buffer_len)
+                        if msg_type == -1:
+                            break
+                except ValueError as exc:
+                    error = f"Malformed ESPHome frame header: {exc}"
+                    break
+
+                # In the modern ESPHome protocol (aioesphomeapi 42.x+), the length field
+                # represents ONLY the payload size, not including the msg_type varint.
+                # This is different from older versions where length = msg_type_size + payload_size.
+                end = pos + length
+                if end > buffer_len:
+                    break  # Wait for the rest of the packet
+                frames.append((msg_type, view[pos:end].tobytes() if length else b""))
+                start = end
+
+        # Only move memory once all data has been consumed or the consumed
+        # prefix grows past the compaction threshold
+        if start == buffer_len:
+            buffer.clear()
+            start = 0
+        elif start > BUFFER_COMPACT_THRESHOLD:
+            del buffer[:start]
+            start = 0
+        self._start = start
+
+        for msg_type, payload in frames:
+            self._process_packet(msg_type, payload)
+
+        if error is not None:
+            logger.error("%s; closing connection", error)
+            self._reset_buffer()
+            self._close_transport()
 
     # Message handling -----------------------------------------------------
 
     def _process_packet(self, msg_type: int, payload: bytes) -> None:
+        entry = self._HANDLERS.get(msg_type)
+        if entry is None:
+            logger.debug("Ignoring unhandled ESPHome message type %s", msg_type)
+            return
+        msg_class, handler = entry
         try:
-            msg_class: Type[Message] = MESSAGE_TYPE_TO_PROTO[msg_type]
             message = msg_class.FromString(payload)
         except Exception as exc:  # pragma: no cover - defensive
             logger.error("Error decoding ESPHome message %s: %s", msg_type, exc, exc_info=True)
             return
 
         logger.debug("Received ESPHome message: %s", msg_class.__name__)
-        self._handle_message(message)
-
-    def _handle_message(self, message: Message) -> None:
-        responses: List[Message] = []
-
-        if isinstance(message, HelloRequest):
-            logger.info(
-                "ESPHome Hello from %s (api %s.%s, encryption=%s)",
-                message.client_info,
-                message.api_version_major,
-                message.api_version_minor,
-                getattr(message, "supports_encryption", False),
-            )
-            responses.append(
-                HelloResponse(
-                    api_version_major=1,
-                    api_version_minor=12,
-                    name=self.name,
-                    server_info=f"renogybt-proxy/{self.version}",
-                )
-            )
-        elif isinstance(message, AuthenticationRequest):
-            responses.append(AuthenticationResponse(invalid_password=False))
-            logger.info("ESPHome client authenticated (no password)")
-        elif isinstance(message, DisconnectRequest):
-            responses.append(DisconnectResponse())
-            self._close_after_send = True
-        elif isinstance(message, PingRequest):
-            responses.append(PingResponse())
-        elif isinstance(message, DeviceInfoRequest):
-            responses.append(
-                DeviceInfoResponse(
-                    uses_password=False,
-                    name=self.name,
-                    mac_address=self.mac_address,
-                    esphome_version=self.version,
-                    compilation_time="",
-                    model="ESPHome Bluetooth Proxy",
-                    manufacturer="ESPHome",
-                    has_deep_sleep=False,
-                    project_name=PROJECT_NAME,
-                    project_version=self.version,
-                    webserver_port=0,
-                    bluetooth_proxy_feature_flags=BLUETOOTH_PROXY_FEATURES,
-                    bluetooth_mac_address=self.mac_address,
-                    api_encryption_supported=False,
-                )
-            )
-        elif isinstance(message, ListEntitiesRequest):
-            # Send sensor entity definitions
-            logger.info("Sending %d sensor entities to Home Assistant", len(self._sensor_entities))
-            for entity_key, entity_info in self._sensor_entities.items():
-                sensor_response = ListEntitiesSensorResponse(
-                    object_id=entity_info.get('object_id', entity_key),
-                    key=entity_info['key'],
-                    name=entity_info.get('name', entity_key),
-                    icon=entity_info.get('icon', ''),
-                    unit_of_measurement=entity_info.get('unit_of_measurement', ''),
-                    accuracy_decimals=entity_info.get('accuracy_decimals', 2),
-                    force_update=entity_info.get('force_update', False),
-                    device_class=entity_info.get('device_class', ''),
-                    state_class=entity_info.get('state_class', SensorStateClass.STATE_CLASS_MEASUREMENT),
-                    disabled_by_default=entity_info.get('disabled_by_default', False),
-                )
-                logger.debug(
-                    "Entity: %s (key=%d, unit=%s)",
-                    entity_info.get('object_id', entity_key),
-                    entity_info['key'],
-                    entity_info.get('unit_of_measurement', '')
-                )
-                responses.append(sensor_response)
-            responses.append(ListEntitiesDoneResponse())
-        elif isinstance(message, SubscribeBluetoothLEAdvertisementsRequest):
-            logger.info("ESPHome client subscribed to BLE advertisements")
-            self._subscribed_to_ble = True
-            self._scanner_state = BluetoothScannerState.BLUETOOTH_SCANNER_STATE_RUNNING
-            # Send scanner state response
-            responses.append(
-                BluetoothScannerStateResponse(
-                    state=self._scanner_state,
-                    mode=self._scanner_mode,
-                    configured_mode=self._scanner_mode,
-                )
-            )
-            if self._on_subscribe_callback:
-                self._on_subscribe_callback(self._send_ble_advertisement)
-        elif isinstance(message, UnsubscribeBluetoothLEAdvertisementsRequest):
-            logger.info("ESPHome client unsubscribed from BLE advertisements")
-            self._subscribed_to_ble = False
-            self._scanner_state = BluetoothScannerState.BLUETOOTH_SCANNER_STATE_IDLE
-            # Send scanner state response
-            responses.append(
-                BluetoothScannerStateResponse(
-                    state=self._scanner_state,
-                    mode=self._scanner_mode,
-                    configured_mode=self._scanner_mode,
-                )
-            )
-        elif isinstance(message, SubscribeBluetoothConnectionsFreeRequest):
-            logger.info("ESPHome client subscribed to connections free updates")
-            self._subscribed_to_connections_free = True
-            # Send initial connections free response
-            # We don't support active connections, so report 0 free/limit
-            responses.append(
-                BluetoothConnectionsFreeResponse(
-                    free=BLUETOOTH_PROXY_MAX_CONNECTIONS,
-                    limit=BLUETOOTH_PROXY_MAX_CONNECTIONS,
-                )
-            )
-            # Send scanner state to advertise Bluetooth capability to Home Assistant
-            # Set scanner to RUNNING if it's currently IDLE (initial state).
-            # If already RUNNING (from a BLE subscription), keep it RUNNING.
-            # This ensures HA knows the proxy has an active scanner during connection handshake.
-            if self._scanner_state == BluetoothScannerState.BLUETOOTH_SCANNER_STATE_IDLE:
-                self._scanner_state = BluetoothScannerState.BLUETOOTH_SCANNER_STATE_RUNNING
-            # Always send the current state so HA knows scanner is available
-            responses.append(
-                BluetoothScannerStateResponse(
-                    state=self._scanner_state,
-                    mode=self._scanner_mode,
-                    configured_mode=self._scanner_mode,
-                )
-            )
-        elif isinstance(message, BluetoothScannerSetModeRequest):
-            # Handle scanner mode changes (active/passive)
-            logger.info("ESPHome client requested scanner mode change to %s", message.mode)
-            self._scanner_mode = message.mode
-            # Send scanner state response with new mode
-            responses.append(
-                BluetoothScannerStateResponse(
-                    state=self._scanner_state,
-                    mode=self._scanner_mode,
-                    configured_mode=BluetoothScannerMode.BLUETOOTH_SCANNER_MODE_PASSIVE,
-                )
-            )
-        elif isinstance(message, SubscribeStatesRequest):
-            logger.info("ESPHome client subscribed to sensor states")
-            self._subscribed_to_states = True
-            # Resend last known sensor states to new subscriber
-            if self._last_sensor_states:
-                logger.info("Resending %d cached sensor states", len(self._last_sensor_states))
-                self.send_sensor_states(self._last_sensor_states)
-        elif isinstance(message, NoiseEncryptionSetKeyRequest):
-            logger.info("ESPHome client attempted to set Noise key; rejecting")
-            responses.append(NoiseEncryptionSetKeyResponse(success=False))
-
-        if responses:
-            self._send_messages(responses)
+        handler(self, message)
         if self._close_after_send:
             self._close_after_send = False
             self._close_transport()
 
+    def _on_hello(self, message: HelloRequest) -> None:
+        logger.info(
+            "ESPHome Hello from %s (api %s.%s, encryption=%s)",
+            message.client_info,
+            message.api_version_major,
+            message.api_version_minor,
+            getattr(message, "supports_encryption", False),
+        )
+        self._write_packets([self._hello_packet])
+
+    def _on_authentication(self, message: AuthenticationRequest) -> None:
+        logger.info("ESPHome client authenticated (no password)")
+        self._write_packets([AUTHENTICATION_RESPONSE_PACKET])
+
+    def _on_disconnect_request(self, message: DisconnectRequest) -> None:
+        self._close_after_send = True
+        self._write_packets([DISCONNECT_RESPONSE_PACKET])
+
+    def _on_ping(self, message: PingRequest) -> None:
+        self._write_packets([PING_RESPONSE_PACKET])
+
+    def _on_device_info(self, message: DeviceInfoRequest) -> None:
+        self._write_packets([self._device_info_packet])
+
+    def _on_list_entities(self, message: ListEntitiesRequest) -> None:
+        # Send sensor entity definitions (pre-serialised, entities are static)
+        logger.info("Sending %d sensor entities to Home Assistant", len(self._sensor_entities))
+        if self._prebuilt_list_entities is None:
+            self._prebuilt_list_entities = _build_list_entities_packets(self._sensor_entities)
+        self._write_packets(self._prebuilt_list_entities)
+
+    def _on_subscribe_ble_advertisements(
+        self, message: SubscribeBluetoothLEAdvertisementsRequest
+    ) -> None:
+        self._send_raw_only = bool(
+            message.flags & BLUETOOTH_PROXY_SUBSCRIPTION_FLAG_RAW_ADVERTISEMENTS
+        )
+        logger.info(
+            "ESPHome client subscribed to BLE advertisements (raw=%s)", self._send_raw_only
+        )
+        self._subscribed_to_ble = True
+        if self._adv_writer_task is None and self._loop is not None:
+            self._adv_writer_task = self._loop.create_task(self._advertisement_writer())
+        self._scanner_state = BluetoothScannerState.BLUETOOTH_SCANNER_STATE_RUNNING
+        if self._on_subscribe_callback:
+            self._on_subscribe_callback(self._send_ble_advertisement)
+        # Send scanner state response
+        self._write_packets(
+            [_scanner_state_packet(self._scanner_state, self._scanner_mode, self._scanner_mode)]
+        )
+
+    def _on_unsubscribe_ble_advertisements(
+        self, message: UnsubscribeBluetoothLEAdvertisementsRequest
+    ) -> None:
+        logger.info("ESPHome client unsubscribed from BLE advertisements")
+        self._subscribed_to_ble = False
+        self._send_raw_only = False
+        self._discard_pending_advs()
+        self._scanner_state = BluetoothScannerState.BLUETOOTH_SCANNER_STATE_IDLE
+        # Send scanner state response
+        self._write_packets(
+            [_scanner_state_packet(self._scanner_state, self._scanner_mode, self._scanner_mode)]
+        )
+
+    def _on_subscribe_connections_free(
+        self, message: SubscribeBluetoothConnectionsFreeRequest
+    ) -> None:
+        logger.info("ESPHome client subscribed to connections free updates")
+        self._subscribed_to_connections_free = True
+        # Send scanner state to advertise Bluetooth capability to Home Assistant
+        # Set scanner to RUNNING if it's currently IDLE (initial state).
+        # If already RUNNING (from a BLE subscription), keep it RUNNING.
+        # This ensures HA knows the proxy has an active scanner during connection handshake.
+        if self._scanner_state == BluetoothScannerState.BLUETOOTH_SCANNER_STATE_IDLE:
+            self._scanner_state = BluetoothScannerState.BLUETOOTH_SCANNER_STATE_RUNNING
+        self._write_packets(
+            [
+                # Send initial connections free response
+                CONNECTIONS_FREE_RESPONSE_PACKET,
+                # Always send the current state so HA knows scanner is available
+                _scanner_state_packet(self._scanner_state, self._scanner_mode, self._scanner_mode),
+            ]
+        )
+
+    def _on_scanner_set_mode(self, message: BluetoothScannerSetModeRequest) -> None:
+        # Handle scanner mode changes (active/passive)
+        logger.info("ESPHome client requested scanner mode change to %s", message.mode)
+        self._scanner_mode = message.mode
+        # Send scanner state response with new mode
+        self._write_packets(
+            [
+                _scanner_state_packet(
+                    self._scanner_state,
+                    self._scanner_mode,
+                    BluetoothScannerMode.BLUETOOTH_SCANNER_MODE_PASSIVE,
+                )
+            ]
+        )
+
+    def _on_subscribe_states(self, message: SubscribeStatesRequest) -> None:
+        logger.info("ESPHome client subscribed to sensor states")
+        self._subscribed_to_states = True
+        # Resend last known sensor states to new subscriber
+        if self._last_sensor_states:
+            logger.info("Resending %d cached sensor states", len(self._last_sensor_states))
+            self.send_sensor_states(self._last_sensor_states)
+
+    def _on_noise_encryption_set_key(
+        self, message: NoiseEncryptionSetKeyRequest
+    ) -> None:
+        logger.info("ESPHome client attempted to set Noise key; rejecting")
+        self._write_packets([NOISE_ENCRYPTION_SET_KEY_REJECTED_PACKET])
+
+    # Dispatch table: msg_type -> (request class, unbound handler), built once
+    # at import so connections do not each create a dict of bound methods
+    _HANDLERS: Dict[int, Tuple[Type[Message], Callable[..., None]]] = {
+        PROTO_TO_MESSAGE_TYPE[msg_class]: (msg_class, handler)
+        for msg_class, handler in (
+            (PingRequest, _on_ping),
+            (SubscribeStatesRequest, _on_subscribe_states),
+            (HelloRequest, _on_hello),
+            (AuthenticationRequest, _on_authentication),
+            (DisconnectRequest, _on_disconnect_request),
+            (DeviceInfoRequest, _on_device_info),
+            (ListEntitiesRequest, _on_list_entities),
+            (SubscribeBluetoothLEAdvertisementsRequest, _on_subscribe_ble_advertisements),
+            (UnsubscribeBluetoothLEAdvertisementsRequest, _on_unsubscribe_ble_advertisements),
+            (SubscribeBluetoothConnectionsFreeRequest, _on_subscribe_connections_free),
+            (BluetoothScannerSetModeRequest, _on_scanner_set_mode),
+            (NoiseEncryptionSetKeyRequest, _on_noise_encryption_set_key),
+        )
+    }
+
     # Helpers --------------------------------------------------------------
 
     def _send_ble_advertisement(self, advertisement: dict) -> None:
         # Only send if there is an active connection transport and a client is subscribed.
         if not self._subscribed_to_ble or not self._transport:
             return
-
+        if self._transport.get_write_buffer_size() > BLE_ADVERTISEMENT_WRITE_BUFFER_LIMIT:
+            # Slow consumer: drop new advertisements rather than queue them
+            self._dropped_advs += 1
+            if self._dropped_advs % 100 == 1:
+                logger.warning(
+                    "ESPHome client not draining; dropped %d BLE advertisements so far",
+                    self._dropped_advs,
+                )
+            return
+        queue = self._adv_queue
+        if queue.full():
+            queue.get_nowait()
+            self._dropped_advs += 1
+            if self._dropped_advs % 100 == 1:
+                logger.warning(
+                    "BLE advertisement queue full; dropped %d BLE advertisements so far",
+                    self._dropped_advs,
+                )
+        queue.put_nowait(advertisement)
+
+    async def _advertisement_writer(self) -> None:
+        """Serialise queued advertisements and write them in batches."""
+        queue = self._adv_queue
+        while True:
+            advertisements = [await queue.get()]
+            if queue.qsize() < BLE_ADVERTISEMENT_BATCH_SIZE - 1:
+                # Let a burst of advertisements coalesce into one frame
+                await asyncio.sleep(BLE_ADVERTISEMENT_BATCH_DELAY)
+            while len(advertisements) < BLE_ADVERTISEMENT_BATCH_SIZE and not queue.empty():
+                advertisements.append(queue.get_nowait())
+            self._write_advertisements(advertisements)
+
+    def _write_advertisements(self, advertisements: List[dict]) -> None:
+        raw_advs: List[bytes] = []
+        packets: List[bytes] = []
+        for advertisement in advertisements:
+            raw_adv, legacy_packet = self._serialise_advertisement(advertisement)
+            if raw_adv is not None:
+                raw_advs.append(raw_adv)
+            if legacy_packet is not None:
+                packets.append(legacy_packet)
+        if raw_advs:
+            # BluetoothLERawAdvertisementsResponse: repeated advertisements = 1
+            payload = bytearray()
+            for raw_adv in raw_advs:
+                payload.append(0x0A)
+                _encode_varint_into(payload, len(raw_adv))
+                payload += raw_adv
+            # Header and payload go out as separate buffers of one writelines()
+            # call, so the batch payload is not copied into a joined frame
+            packets.append(
+                _frame_header(
+                    MESSAGE_TYPE_VARINTS[BluetoothLERawAdvertisementsResponse], len(payload)
+                )
+            )
+            packets.append(payload)
+        self._write_packets(packets)
+
+    def _serialise_advertisement(
+        self, advertisement: dict
+    ) -> Tuple[Optional[bytes], Optional[bytes]]:
+        """Return the raw advertisement submessage and, for legacy clients, the
+        framed BluetoothLEAdvertisementResponse for one advertisement dict."""
         try:
-            address = int(advertisement["address"].replace(":", ""), 16)
+            address = _mac_str_to_int(advertisement["address"])
             rssi = int(advertisement.get("rssi", 0))
             address_type = 1 if advertisement.get("address_type") == "random" else 0
             manufacturer_data = advertisement.get("manufacturer_data", {}) or {}
@@ -413,27 +831,16 @@ class ESPHomeAPIProtocol(asyncio.Protocol):
                     normalized_service[key] = bytes(value or b"")
             service_data = normalized_service
 
-            raw_segments: List[bytes] = []
-
-            def add_segment(ad_type: int, payload: bytes) -> None:
-                if not payload:
-                    return
-                length = len(payload) + 1
-                if length > 255:
-                    logger.debug(
-                        "Skipping AD type %s due to payload length %s", ad_type, length
-                    )
-                    return
-                raw_segments.append(bytes((length, ad_type)) + payload)
+            raw = bytearray()
 
             flags = advertisement.get("flags")
             if isinstance(flags, int):
-                add_segment(0x01, bytes([flags & 0xFF]))
+                _append_ad_segment(raw, 0x01, _UINT8_TABLE[flags & 0xFF])
             else:
-                add_segment(0x01, b"\x06")
+                _append_ad_segment(raw, 0x01, b"\x06")
 
             if name_bytes:
-                add_segment(0x09, name_bytes)
+                raw.extend(_name_ad_segment(name_bytes))
 
             for company_id, data_bytes in manufacturer_data.items():
                 try:
@@ -443,70 +850,43 @@ class ESPHomeAPIProtocol(asyncio.Protocol):
                         "Skipping manufacturer data with unexpected key %r", company_id
                     )
                     continue
-                payload = bytes(
-                    (company_int & 0xFF, (company_int >> 8) & 0xFF)
-                ) + data_bytes
-                add_segment(0xFF, payload)
+                payload = _LE_U16.pack(company_int & 0xFFFF) + data_bytes
+                _append_ad_segment(raw, 0xFF, payload)
 
             for uuid_str, data_bytes in service_data.items():
-                normalized_uuid = uuid_str.replace("-", "")
-                if len(normalized_uuid) == 4:
-                    add_segment(
-                        0x16, bytes.fromhex(normalized_uuid)[::-1] + data_bytes
-                    )
-                elif len(normalized_uuid) == 8:
-                    add_segment(
-                        0x20, bytes.fromhex(normalized_uuid)[::-1] + data_bytes
-                    )
-                elif len(normalized_uuid) == 32:
-                    add_segment(
-                        0x21, bytes.fromhex(normalized_uuid)[::-1] + data_bytes
-                    )
+                bit_length, uuid_bytes = _uuid_to_reversed_bytes(uuid_str)
+                if bit_length == 16:
+                    _append_ad_segment(raw, 0x16, uuid_bytes + data_bytes)
+                elif bit_length == 32:
+                    _append_ad_segment(raw, 0x20, uuid_bytes + data_bytes)
+                elif bit_length == 128:
+                    _append_ad_segment(raw, 0x21, uuid_bytes + data_bytes)
                 else:
                     logger.debug(
                         "Skipping service data for unsupported UUID %s", uuid_str
                     )
 
-            uuid_16_bytes = []
-            uuid_32_bytes = []
-            uuid_128_bytes = []
-            for uuid_str in service_uuids:
-                normalized_uuid = uuid_str.replace("-", "")
-                if len(normalized_uuid) == 4:
-                    uuid_16_bytes.append(bytes.fromhex(normalized_uuid)[::-1])
-                elif len(normalized_uuid) == 8:
-                    uuid_32_bytes.append(bytes.fromhex(normalized_uuid)[::-1])
-                elif len(normalized_uuid) == 32:
-                    uuid_128_bytes.append(bytes.fromhex(normalized_uuid)[::-1])
-                else:
-                    logger.debug(
-                        "Skipping service UUID with unsupported format: %s", uuid_str
-                    )
-            if uuid_16_bytes:
-                add_segment(0x03, b"".join(uuid_16_bytes))
-            if uuid_32_bytes:
-                add_segment(0x05, b"".join(uuid_32_bytes))
-            if uuid_128_bytes:
-                add_segment(0x07, b"".join(uuid_128_bytes))
+            if service_uuids:
+                raw.extend(_service_uuids_ad_segments(tuple(service_uuids)))
 
             tx_power = advertisement.get("tx_power")
             if isinstance(tx_power, int):
-                add_segment(0x0A, bytes([tx_power & 0xFF]))
-
-            raw_adv = BluetoothLERawAdvertisement(
-                address=address,
-                rssi=rssi,
-                address_type=address_type,
-                data=b"".join(raw_segments),
-            )
-
-            legacy_adv = BluetoothLEAdvertisementResponse(
-                address=address,
-                rssi=rssi,
-                address_type=address_type,
-                name=name_bytes,
-                service_uuids=list(service_uuids),
-            )
+                _append_ad_segment(raw, 0x0A, _UINT8_TABLE[tx_power & 0xFF])
+
+            raw_adv = _encode_raw_advertisement(address, rssi, address_type, raw)
+            if self._send_raw_only:
+                # Raw-capable clients ignore the legacy message entirely
+                return raw_adv, None
+
+            # Serialised right away, so one scratch message is reused
+            legacy_adv = self._legacy_adv
+            legacy_adv.Clear()
+            legacy_adv.address = address
+            legacy_adv.rssi = rssi
+            legacy_adv.address_type = address_type
+            legacy_adv.name = name_bytes
+            if service_uuids:
+                legacy_adv.service_uuids.extend(service_uuids)
             for uuid_str, data_bytes in service_data.items():
                 entry = legacy_adv.service_data.add()
                 entry.uuid = uuid_str
@@ -521,15 +901,24 @@ class ESPHomeAPIProtocol(asyncio.Protocol):
                     )
                     continue
                 entry = legacy_adv.manufacturer_data.add()
-                entry.uuid = str(company_int)
+                entry.uuid = _company_id_str(company_int)
                 entry.data = data_bytes
-            raw_response = BluetoothLERawAdvertisementsResponse(
-                advertisements=[raw_adv]
-            )
 
-            self._send_messages([legacy_adv, raw_response])
+            return raw_adv, _frame(
+                MESSAGE_TYPE_VARINTS[BluetoothLEAdvertisementResponse],
+                legacy_adv.SerializeToString(),
+            )
         except Exception as exc:  # pragma: no cover - defensive
             logger.error("Failed to serialise BLE advertisement: %s", exc, exc_info=True)
+            return None, None
+
+    def _discard_pending_advs(self) -> None:
+        if self._adv_writer_task is not None:
+            self._adv_writer_task.cancel()
+            self._adv_writer_task = None
+        queue = self._adv_queue
+        while not queue.empty():
+            queue.get_nowait()
 
     def send_sensor_states(self, sensor_data: Dict[str, float]) -> None:
         """Send sensor state updates to subscribed clients."""
@@ -540,27 +929,22 @@ class ESPHomeAPIProtocol(asyncio.Protocol):
             return
 
         try:
-            responses = []
+            packets = []
             skipped_keys = []
             
             for data_key, value in sensor_data.items():
                 # Use reverse mapping for O(1) lookup instead of nested loop
                 entity_info = self._data_key_to_entity.get(data_key)
                 if entity_info:
-                    sensor_state = SensorStateResponse(
-                        key=entity_info['key'],
-                        state=float(value),
-                        missing_state=False,
-                    )
-                    responses.append(sensor_state)
+                    packets.append(_sensor_state_packet(entity_info['key'], float(value)))
                 else:
                     # Only log if it's not an expected unmapped key
                     if not data_key.startswith(('cell_voltage_', 'temperature_', '__', 'function', 'cell_count', 'sensor_count', 'model', 'device_id')):
                         skipped_keys.append(data_key)
             
-            if responses:
-                self._send_messages(responses)
-                logger.debug("✅ Sent %d sensor state updates", len(responses))
+            if packets:
+                self._write_packets(packets)
+                logger.debug("✅ Sent %d sensor state updates", len(packets))
                 if skipped_keys:
                     logger.warning("Skipped %d unmapped keys: %s", len(skipped_keys), skipped_keys)
             else:
@@ -568,69 +952,20 @@ class ESPHomeAPIProtocol(asyncio.Protocol):
         except Exception as exc:  # pragma: no cover - defensive
             logger.error("Failed to send sensor states: %s", exc, exc_info=True)
 
-    def _send_messages(self, messages: List[Message]) -> None:
+    def _write_packets(self, packets: List[bytes]) -> None:
         # Use writelines() to send all packets in a single operation for better latency
-        if not self._transport:
+        if not self._transport or not packets:
             return
-
-        try:
-            packets = []
-            for msg in messages:
-                logger.debug("Sending ESPHome message: %s", msg.__class__.__name__)
-                msg_type = PROTO_TO_MESSAGE_TYPE[msg.__class__]
-                payload = msg.SerializeToString()
-                packet = _make_packet(msg_type, payload)
-                logger.debug("ESPHome packet bytes (len=%d): %s", len(payload), payload.hex())
-                packets.append(packet)
-            
-            # Send all packets at once to reduce TCP buffering delays
-            if packets:
-                if self._writelines:
-                    # Use writelines for all packets (even single ones) to minimize latency
-                    self._writelines(packets)
-                else:
-                    # Fallback to individual writes if writelines not available
-                    for packet in packets:
-                        self._transport.write(packet)  # type: ignore[union-attr]
-        except Exception as exc:  # pragma: no cover - defensive
-            logger.error("Failed to send ESPHome messages: %s", exc, exc_info=True)
-
-    def _read(self, length: int) -> Optional[bytes]:
-        new_pos = self._pos + length
-        if self._buffer_len < new_pos:
-            return None
-        assert self._buffer is not None
-        data = self._buffer[self._pos:new_pos]
-        self._pos = new_pos
-        return data
-
-    def _read_varuint(self) -> int:
-        if not self._buffer:
-            return -1
-        result = 0
-        shift = 0
-        while self._buffer_len > self._pos:
-            byte = self._buffer[self._pos]
-            self._pos += 1
-            result |= (byte & 0x7F) << shift
-            if not (byte & 0x80):
-                return result
-            shift += 7
-        return -1
-
-    def _remove_from_buffer(self) -> None:
-        end_pos = self._pos
-        self._buffer_len -= end_pos
-        if self._buffer_len == 0:
-            self._buffer = None
-            return
-        assert self._buffer is not None
-        self._buffer = self._buffer[end_pos:]
+        if self._writelines:
+            # Use writelines for all packets (even single ones) to minimize latency
+            self._writelines(packets)
+        else:
+            # Fallback to a single joined write if writelines not available
+            self._transport.write(b"".join(packets))
 
     def _reset_buffer(self) -> None:
-        self._buffer = None
-        self._buffer_len = 0
-        self._pos = 0
+        self._buffer.clear()
+        self._start = 0
 
     def _close_transport(self) -> None:
         if self._transport:
@@ -650,10 +985,12 @@ class ESPHomeAPIServer:
         self.mac_address = mac_address
         self.port = port
         self.version = version
+        self._handshake_packets = _build_handshake_packets(name, mac_address, version)
         self._server: Optional[asyncio.base_events.Server] = None
         self._advertisement_callback: Optional[Callable[[Callable[[dict], None]], None]] = None
         self._sensor_entities: Dict[str, Dict] = {}
-        self._active_protocols: List[ESPHomeAPIProtocol] = []
+        self._list_entities_packets: Optional[List[bytes]] = None
+        self._active_protocols: Set[ESPHomeAPIProtocol] = set()
 
     def set_advertisement_callback(self, callback: Callable[[Callable[[dict], None]], None]) -> None:
         self._advertisement_callback = callback
@@ -673,14 +1010,16 @@ class ESPHomeAPIServer:
             # Merge new entities with existing
             self._sensor_entities.update(entities)
         
+        # Entities only change here, so serialise the ListEntities packets once
+        self._list_entities_packets = _build_list_entities_packets(self._sensor_entities)
+        
+        data_key_to_entity = _index_entities_by_data_key(self._sensor_entities)
+        
         # Update reverse mapping in all active protocols
         for protocol in self._active_protocols:
             protocol._sensor_entities = self._sensor_entities
-            protocol._data_key_to_entity = {}
-            for entity_key, entity_info in self._sensor_entities.items():
-                # Map from the actual data key (e.g., 'power') to the entity info
-                if 'data_key' in entity_info:
-                    protocol._data_key_to_entity[entity_info['data_key']] = entity_info
+            protocol._prebuilt_list_entities = self._list_entities_packets
+            protocol._data_key_to_entity = data_key_to_entity
         logger.info("Configured %d sensor entities (replace=%s)", len(self._sensor_entities), replace)
         
         # If this is the first time entities are added, disconnect clients to force re-discovery
@@ -695,6 +1034,13 @@ class ESPHomeAPIServer:
                 except Exception:
                     pass
 
+    def has_advertisement_subscribers(self) -> bool:
+        """Whether any connected client is subscribed to BLE advertisements.
+
+        Lets callers skip converting scanner results nobody will receive.
+        """
+        return any(protocol._subscribed_to_ble for protocol in self._active_protocols)
+
     def send_sensor_states(self, sensor_data: Dict[str, float]) -> None:
         """Send sensor state updates to all connected clients."""
         for protocol in self._active_protocols:
@@ -711,8 +1057,10 @@ class ESPHomeAPIServer:
                 self._advertisement_callback,
                 self._sensor_entities,
                 on_disconnect=lambda: self._remove_protocol(protocol),
+                list_entities_packets=self._list_entities_packets,
+                handshake_packets=self._handshake_packets,
             )
-            self._active_protocols.append(protocol)
+            self._active_protocols.add(protocol)
             return protocol
 
         # Create server with SO_REUSEADDR and SO_REUSEPORT to allow quick restart
@@ -726,9 +1074,8 @@ class ESPHomeAPIServer:
         logger.info("ESPHome native API server listening on %d", self.port)
 
     def _remove_protocol(self, protocol: ESPHomeAPIProtocol) -> None:
-        """Remove a disconnected protocol from the active list."""
-        if protocol in self._active_protocols:
-            self._active_protocols.remove(protocol)
+        """Remove a disconnected protocol from the active set."""
+        self._active_protocols.discard(protocol)
 
     async def stop(self) -> None:
         if not self._server:
@@ -2,9 +2,14 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import ipaddress
 import logging
 import socket
-from typing import Optional
+import struct
+import sys
+from typing import Dict, List, Optional, Tuple
 
 from zeroconf import IPVersion
 from zeroconf.asyncio import AsyncServiceInfo, AsyncZeroconf
@@ -13,10 +18,69 @@ from .esphome_api_server import PROJECT_NAME
 
 logger = logging.getLogger(__name__)
 
+SERVICE_TYPE = "_esphomelib._tcp.local."
+
+# Upper bound in seconds on local IP detection during start(); this also
+# covers the gethostbyname() fallback, which has no timeout of its own
+IP_DETECTION_TIMEOUT = 2.0
+
+# Per-attempt timeout in seconds for the UDP route probes
+ROUTE_PROBE_TIMEOUT = 0.5
+
+# One AsyncZeroconf (sockets + background tasks) shared by every advertised
+# service; closed when the last ESPHomeDiscovery stops
+_shared_zeroconf: Optional[AsyncZeroconf] = None
+_shared_zeroconf_users = 0
+_shared_zeroconf_lock: Optional[asyncio.Lock] = None
+
+
+def _zeroconf_lock() -> asyncio.Lock:
+    global _shared_zeroconf_lock
+    if _shared_zeroconf_lock is None:
+        _shared_zeroconf_lock = asyncio.Lock()
+    return _shared_zeroconf_lock
+
+
+async def _acquire_zeroconf() -> AsyncZeroconf:
+    global _shared_zeroconf, _shared_zeroconf_users
+    async with _zeroconf_lock():
+        if _shared_zeroconf is None:
+            _shared_zeroconf = AsyncZeroconf(ip_version=IPVersion.V4Only)
+        _shared_zeroconf_users += 1
+        return _shared_zeroconf
+
+
+async def _release_zeroconf() -> None:
+    global _shared_zeroconf, _shared_zeroconf_users
+    async with _zeroconf_lock():
+        _shared_zeroconf_users -= 1
+        if _shared_zeroconf_users > 0 or _shared_zeroconf is None:
+            return
+        aiozc = _shared_zeroconf
+        _shared_zeroconf = None
+        _shared_zeroconf_users = 0
+        await aiozc.async_close()
+
 
 class ESPHomeDiscovery:
     """Advertise the proxy over mDNS so Home Assistant discovers it automatically."""
 
+    __slots__ = (
+        "name",
+        "port",
+        "version",
+        "mac",
+        "_ip_override",
+        "_aiozc",
+        "_external_aiozc",
+        "_service_info",
+        "_service_info_ips",
+        "_cached_local_ips",
+        "_service_name",
+        "_server",
+        "_properties",
+    )
+
     def __init__(
         self,
         name: str,
@@ -24,87 +88,274 @@ class ESPHomeDiscovery:
         version: str = "2024.12.0",
         mac: Optional[str] = None,
         ip: Optional[str] = None,
+        aiozc: Optional[AsyncZeroconf] = None,
     ) -> None:
-        self.name = name.replace(" ", "-").lower()
+        self.name = sys.intern(name.replace(" ", "-").lower())
         self.port = port
         self.version = version
         self.mac = (mac or "00:00:00:00:00:00").lower()
         self._ip_override = ip
         self._aiozc: Optional[AsyncZeroconf] = None
+        # Caller-owned instance (e.g. Home Assistant's); never closed here
+        self._external_aiozc = aiozc
         self._service_info: Optional[AsyncServiceInfo] = None
+        self._service_info_ips: Tuple[str, ...] = ()
+        self._cached_local_ips: Tuple[str, ...] = ()
+        self._service_name = sys.intern(f"{self.name}.{SERVICE_TYPE}")
+        # Provide an explicit host name to strengthen discovery consistency
+        self._server = sys.intern(f"{socket.gethostname()}.local.")
+        # TXT record entries are static, so encode them once up front
+        self._properties: Dict[bytes, bytes] = {
+            key.encode(): value.encode()
+            for key, value in {
+                "version": self.version,
+                "mac": self.mac,
+                "platform": "linux",
+                "board": "generic",
+                "network": "ethernet",
+                # Use an API minor version broadly compatible with HA
+                "api_version": "1.12",
+                "use_password": "false",
+                "bluetooth_proxy": "true",
+                "bluetooth_proxy_version": "5",
+                "bluetooth_proxy_feature_flags": "97",
+                "project_name": PROJECT_NAME,
+                "project_version": self.version,
+            }.items()
+        }
 
     async def start(self) -> None:
-        ip_addr = self._ip_override or self._detect_ip()
-        address = socket.inet_aton(ip_addr)
-
-        properties = {
-            "version": self.version,
-            "mac": self.mac,
-            "platform": "linux",
-            "board": "generic",
-            "network": "ethernet",
-            # Use an API minor version broadly compatible with HA
-            "api_version": "1.12",
-            "use_password": "false",
-            "bluetooth_proxy": "true",
-            "bluetooth_proxy_version": "5",
-            "bluetooth_proxy_feature_flags": "97",
-            "project_name": PROJECT_NAME,
-            "project_version": self.version,
-        }
+        if self._aiozc is not None:
+            return
+        if not self._cached_local_ips:
+            if self._ip_override:
+                self._cached_local_ips = (self._ip_override,)
+            else:
+                # Detection may fall back to socket/DNS calls; keep them off the
+                # loop and give up quickly on a broken network
+                detection = asyncio.get_running_loop().run_in_executor(None, _detect_local_ips)
+                try:
+                    self._cached_local_ips = await asyncio.wait_for(
+                        detection, IP_DETECTION_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    raise RuntimeError(
+                        "Timed out determining local IP address for ESPHome discovery"
+                    ) from None
+        ip_addrs = self._cached_local_ips
 
-        service_type = "_esphomelib._tcp.local."
-        service_name = f"{self.name}.{service_type}"
+        # The service record only depends on the addresses, so keep it across
+        # stop()/start() cycles and rebuild it only when they change
+        if self._service_info is None or self._service_info_ips != ip_addrs:
+            self._service_info = AsyncServiceInfo(
+                type_=SERVICE_TYPE,
+                name=self._service_name,
+                addresses=[_packed_ipv4(ip_addr) for ip_addr in ip_addrs],
+                port=self.port,
+                properties=self._properties,
+                server=self._server,
+            )
+            self._service_info_ips = ip_addrs
 
-        self._aiozc = AsyncZeroconf(ip_version=IPVersion.V4Only)
-        # Provide an explicit host name to strengthen discovery consistency
-        server_host = f"{socket.gethostname()}.local."
-        self._service_info = AsyncServiceInfo(
-            type_=service_type,
-            name=service_name,
-            addresses=[address],
-            port=self.port,
-            properties=properties,
-            server=server_host,
+        aiozc = self._external_aiozc or await _acquire_zeroconf()
+        try:
+            await aiozc.async_register_service(self._service_info)
+        except Exception:
+            if self._external_aiozc is None:
+                await _release_zeroconf()
+            raise
+        self._aiozc = aiozc
+        logger.info(
+            "Advertised ESPHome proxy via mDNS as %s (%s:%d)",
+            self._service_name,
+            ", ".join(ip_addrs),
+            self.port,
         )
 
-        await self._aiozc.async_register_service(self._service_info)
-        logger.info("Advertised ESPHome proxy via mDNS as %s (%s:%d)", service_name, ip_addr, self.port)
-
     async def stop(self) -> None:
         if not self._aiozc or not self._service_info:
             return
         try:
             await self._aiozc.async_unregister_service(self._service_info)
         finally:
-            await self._aiozc.async_close()
-        self._aiozc = None
-        self._service_info = None
+            self._aiozc = None
+            if self._external_aiozc is None:
+                await _release_zeroconf()
         logger.info("Stopped ESPHome proxy mDNS advertisement")
 
-    def _detect_ip(self) -> str:
-        candidates = [
-            ("8.8.8.8", 80),
-            ("192.168.1.1", 80),
-        ]
-        for host, port in candidates:
-            try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                sock.connect((host, port))
-                ip = sock.getsockname()[0]
-                sock.close()
-                if ip and not ip.startswith("127."):
-                    return ip
-            except OSError:
-                continue
-        try:
-            hostname = socket.gethostname()
-            ip = socket.gethostbyname(hostname)
-            if ip and not ip.startswith("127."):
-                return ip
-        except OSError:
-            pass
-        raise RuntimeError("Unable to determine local IP address for ESPHome discovery")
+    def invalidate_ip_cache(self) -> None:
+        """Forget the detected addresses, e.g. after a network change.
+
+        The next start() detects the addresses again and rebuilds the service
+        record if they changed.
+        """
+        self._cached_local_ips = ()
+        _detect_local_ips.cache_clear()
+
+
+@functools.lru_cache(maxsize=16)
+def _packed_ipv4(ip: str) -> bytes:
+    """Return the 4-byte network-order form of ``ip``."""
+    return ipaddress.IPv4Address(ip).packed
+
+
+# SIOCGIFADDR/SIOCGIFFLAGS ioctl request numbers and interface flags (Linux)
+_SIOCGIFADDR = 0x8915
+_SIOCGIFFLAGS = 0x8913
+_IFF_UP = 0x1
+_IFF_BROADCAST = 0x2
+
+
+def _default_route_interface() -> Optional[str]:
+    """Return the interface carrying the IPv4 default route, from /proc/net/route."""
+    try:
+        with open("/proc/net/route", encoding="ascii") as routes:
+            next(routes, None)  # header
+            for line in routes:
+                fields = line.split()
+                # Destination 00000000 with the RTF_UP|RTF_GATEWAY flags set
+                if len(fields) > 3 and fields[1] == "00000000" and int(fields[3], 16) & 0x3 == 0x3:
+                    return fields[0]
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _interface_ip(ifname: str) -> Optional[str]:
+    """Return the IPv4 address of ``ifname`` without touching the network."""
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - non-POSIX platforms
+        return None
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            request = struct.pack("256s", ifname[:15].encode())
+            return socket.inet_ntoa(fcntl.ioctl(sock.fileno(), _SIOCGIFADDR, request)[20:24])
+    except OSError:
+        return None
+
+
+def _is_usable_ip(ip: Optional[str]) -> bool:
+    """Whether Home Assistant could reach ``ip``: not loopback, link-local
+    (169.254.0.0/16, e.g. a DHCP failure) or unspecified."""
+    if not ip:
+        return False
+    try:
+        address = ipaddress.IPv4Address(ip)
+    except ValueError:
+        return False
+    return not (address.is_loopback or address.is_link_local or address.is_unspecified)
+
+
+# Interfaces whose addresses Home Assistant should not use to reach the
+# proxy: loopback, container/VM bridges, and VPN or overlay tunnels
+_VIRTUAL_INTERFACE_PREFIXES = (
+    "lo",
+    "docker",
+    "veth",
+    "br-",
+    "virbr",
+    "tun",
+    "tap",
+    "wg",
+    "tailscale",
+    "zt",
+)
+
+
+def _interface_flags(ifname: str) -> Optional[int]:
+    """Return the SIOCGIFFLAGS flags of ``ifname``, or None if unavailable."""
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - non-POSIX platforms
+        return None
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            request = struct.pack("256s", ifname[:15].encode())
+            return struct.unpack_from("H", fcntl.ioctl(sock.fileno(), _SIOCGIFFLAGS, request), 16)[0]
+    except OSError:
+        return None
+
+
+def _is_lan_interface(ifname: str) -> bool:
+    """Whether ``ifname`` looks like a LAN interface: not a known virtual or
+    tunnel name, and up with broadcast (point-to-point tunnels lack it)."""
+    if ifname.startswith(_VIRTUAL_INTERFACE_PREFIXES):
+        return False
+    flags = _interface_flags(ifname)
+    if flags is None:
+        return True
+    return flags & (_IFF_UP | _IFF_BROADCAST) == _IFF_UP | _IFF_BROADCAST
+
+
+def _enumerate_ipv4_addresses() -> List[str]:
+    """Return the IPv4 addresses of the LAN interfaces, in index order."""
+    try:
+        interfaces = socket.if_nameindex()
+    except (AttributeError, OSError):
+        return []
+    addresses = []
+    for _, ifname in interfaces:
+        if not _is_lan_interface(ifname):
+            continue
+        ip = _interface_ip(ifname)
+        if _is_usable_ip(ip):
+            addresses.append(ip)
+    return addresses
+
+
+def _probe_route(sock: socket.socket, destination: Tuple[str, int]) -> Optional[str]:
+    """Return the source address the kernel picks for ``destination``.
+
+    Connecting a UDP socket sends no packets, it only performs a route lookup.
+    """
+    try:
+        sock.connect(destination)
+        return sock.getsockname()[0]
+    except OSError:
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def _detect_local_ips() -> Tuple[str, ...]:
+    """Determine the LAN IPv4 addresses to advertise, preferred address first.
+
+    Cached after the first success.
+    """
+    addresses = _enumerate_ipv4_addresses()
+    ifname = _default_route_interface()
+    # A default route through a VPN tunnel does not make its address reachable
+    if ifname and _is_lan_interface(ifname):
+        ip = _interface_ip(ifname)
+        if _is_usable_ip(ip):
+            # Advertise every interface, the default-route one first
+            return (ip, *(address for address in addresses if address != ip))
+    if addresses:
+        return tuple(addresses)
+
+    candidates = [
+        ("8.8.8.8", 80),
+        ("192.168.1.1", 80),
+    ]
+    try:
+        # One socket serves every probe: a UDP socket may be re-connected. The
+        # LAN probe only runs if the public route gives no usable address
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(ROUTE_PROBE_TIMEOUT)
+            for destination in candidates:
+                ip = _probe_route(sock, destination)
+                if _is_usable_ip(ip):
+                    return (ip,)
+    except OSError:
+        pass
+    try:
+        hostname = socket.gethostname()
+        ip = socket.gethostbyname(hostname)
+        if _is_usable_ip(ip):
+            return (ip,)
+    except OSError:
+        pass
+    raise RuntimeError("Unable to determine local IP address for ESPHome discovery")
 
 
 __all__ = ["ESPHomeDiscovery"]
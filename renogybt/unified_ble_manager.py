@@ -294,10 +294,14 @@ class UnifiedBLEManager:
             response_data = []
             
             def notification_handler(sender, data):
-                logger.debug("Notification received for %s: %d bytes: %s", name, len(data), data.hex())
-                response_data.append(bytes(data))
+                # Bleak delivers notifications on the event loop thread, so the
+                # future can be resolved directly; copy the buffer only once
+                payload = bytes(data)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Notification received for %s: %d bytes: %s", name, len(payload), payload.hex())
+                response_data.append(payload)
                 if not response_future.done():
-                    response_future.set_result(bytes(data))
+                    response_future.set_result(payload)
             
             # Start notifications
             await client.start_notify(notify_uuid, notification_handler)
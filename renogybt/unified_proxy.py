@@ -25,7 +25,7 @@ from typing import Optional
 from renogybt.unified_ble_manager import UnifiedBLEManager
 from renogybt.esphome_api_server import ESPHomeAPIServer
 from renogybt.esphome_discovery import ESPHomeDiscovery
-from renogybt.Utils import bytes_to_int, format_temperature
+from renogybt.Utils import bytes_to_int, format_temperature, run_event_loop
 from bleak import AdvertisementData, BLEDevice
 
 # Setup logging
@@ -82,9 +82,10 @@ class UnifiedRenogyProxy:
             logger.info("  Renogy interval: %.1fs", renogy_interval)
         
         # Create ESPHome API server
+        mac_address = self._get_mac_address()
         self.esphome_server = ESPHomeAPIServer(
             name=device_name,
-            mac_address=self._get_mac_address(),
+            mac_address=mac_address,
             port=api_port,
         )
         
@@ -101,7 +102,7 @@ class UnifiedRenogyProxy:
         self.esphome_discovery = ESPHomeDiscovery(
             name=device_name,
             port=api_port,
-            mac=self._get_mac_address(),
+            mac=mac_address,
             ip=mdns_ip if mdns_ip else None,
         )
         
@@ -288,6 +289,9 @@ class UnifiedRenogyProxy:
         """
         if not hasattr(self, '_send_callback') or not self._send_callback:
             return
+        # The sender stays registered after its client disconnects
+        if not self.esphome_server.has_advertisement_subscribers():
+            return
             
         # Convert advertisement to format expected by ESPHome
         payload = {
@@ -440,4 +444,4 @@ async def main():
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    run_event_loop(main())